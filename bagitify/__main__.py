@@ -0,0 +1,6 @@
+"""Allow running bagitify as `python -m bagitify`."""
+
+from bagitify.bagitify import cli
+
+if __name__ == "__main__":
+    cli(prog_name="bagitify")
@@ -4,32 +4,98 @@
 For more information on the bagit standard, see: https://en.wikipedia.org/wiki/BagIt
 """
 
-import bagit
 import click
 import datetime
+import hashlib
 import json
 import os
-import re
 import requests
+import stat
+import threading
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
 
-click_datetime_formats = ['%Y-%m-%d', '%Y-%m-%dT%H:%M:%SZ']
 dt_format = "%Y-%m-%dT%H:%M:%SZ"
+default_max_workers = 4
+# large chunks keep the number of write calls per file low; one chunk is buffered per download worker
+download_chunk_size = 8 * 1024 * 1024
+# digests commonly used for bagit manifests; sha512 is usually faster than sha256 on 64-bit CPUs without SHA extensions
+checksum_algorithms = ["md5", "sha1", "sha256", "sha512"]
+# timeouts in seconds; ERDDAP can take a while to assemble a large netCDF response before sending it
+connect_timeout = 5
+default_read_timeout = 600
+request_timeout = (connect_timeout, default_read_timeout)
+default_checksums = ["sha256"]
 DatetimeT = datetime.datetime
 
 
-def get_start_end(tabledap_url: str) -> tuple[DatetimeT, DatetimeT]:
+class DownloadCancelled(Exception):
+    """Raised in a download thread when the rest of the run has been abandoned."""
+
+
+class IsoDateTime(click.ParamType):
+    """Click parameter type for ISO 8601 dates and datetimes, e.g. 2022-05-01 or 2022-05-01T00:00:00Z.
+
+    Parsed with a single fromisoformat call rather than trying strptime formats in turn.
+    Times with a UTC offset are converted to naive UTC, matching the times read from ERDDAP.
+    """
+
+    name = "datetime"
+
+    def convert(self, value, param, ctx) -> DatetimeT:
+        if isinstance(value, DatetimeT):
+            return value
+        try:
+            parsed = DatetimeT.fromisoformat(value.removesuffix("Z"))
+        except ValueError:
+            self.fail(f"'{value}' is not an ISO 8601 date or datetime, such as 2022-05-01 or 2022-05-01T00:00:00Z.", param, ctx)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return parsed
+
+
+def create_session(pool_size: int = default_max_workers, retry_reads: bool = True) -> requests.Session:
+    """Create a requests session that keeps connections alive and retries transient server errors.
+
+    Rate limiting (429) is retried too, honouring the server's Retry-After header.
+    With `retry_reads` false, read errors and timeouts are not retried, which is what netCDF downloads want:
+    a retry would make ERDDAP run the same expensive query again from scratch.
+    """
+    retries = Retry(
+        total=5, read=None if retry_reads else 0, backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# shared by all requests to ERDDAP so connections (and TLS handshakes) are reused across calls
+_session = create_session()
+# netCDF downloads outside download_netcdf_range, which must not re-run a timed out query
+_download_session = create_session(retry_reads=False)
+_print_lock = threading.Lock()
+
+
+def print_line(message: str):
+    """Print a message as a whole line, even when called from concurrent download threads."""
+    with _print_lock:
+        print(message)
+
+
+def get_start_end(tabledap_url: str, cache_dir: Optional[Path] = None) -> tuple[DatetimeT, DatetimeT]:
     start_end_url = f'{tabledap_url}.csv0?time&orderByMinMax(%22time%22)'
-    r = requests.get(start_end_url, allow_redirects=True)
-    r.raise_for_status()
-    processed = [
-        parse_datetime(dt_str)
-        for dt_str in r.content.decode("utf-8").strip().split("\n")
-    ]
-    start = processed[0]
-    end = processed[1]
+    content = cached_get(start_end_url, cache_dir)
+    # the response is exactly two csv lines, the minimum and maximum time
+    start_str, end_str = content.decode("utf-8").split()
+    start = parse_datetime(start_str)
+    end = parse_datetime(end_str)
     return (start, end)
 
 
@@ -39,75 +105,174 @@ def round_to_start_of_month(start_datetime: DatetimeT) -> DatetimeT:
     return month_start
 
 
-def round_to_next_month(end_datetime: DatetimeT) -> DatetimeT:
-    if end_datetime.month < 12:
-        next_month_start = datetime.datetime(
-            day=1, month=end_datetime.month + 1, year=end_datetime.year)
-    else:
-        next_month_start = datetime.datetime(
-            day=1, month=1, year=end_datetime.year + 1)
-    return next_month_start
+def add_months(month_start: DatetimeT, months: int) -> DatetimeT:
+    """Return the start of the month `months` months after the month of `month_start`."""
+    month = month_start.year * 12 + month_start.month - 1 + months
+    return datetime.datetime(day=1, month=month % 12 + 1, year=month // 12)
 
 
 def format_datetime(datetime: DatetimeT) -> str:
-    return datetime.strftime(dt_format)
+    # same output as strftime(dt_format), but isoformat avoids the slower strftime machinery
+    if datetime.tzinfo is not None:
+        # strftime(dt_format) ignores the timezone, so drop it rather than let isoformat append an offset
+        datetime = datetime.replace(tzinfo=None)
+    return datetime.isoformat(timespec="seconds") + "Z"
 
 
 def parse_datetime(dt_str: str) -> DatetimeT:
-    return datetime.datetime.strptime(dt_str, dt_format)
+    # ERDDAP timestamps are ISO 8601 in UTC; fromisoformat is much faster than strptime(dt_format)
+    return datetime.datetime.fromisoformat(dt_str.removesuffix("Z"))
+
 
+def should_download_netcdf(nc_path_stat: Optional[os.stat_result], end_datetime: DatetimeT, force: bool = False) -> bool:
+    """Decide whether a netCDF file covering data up to `end_datetime` needs to be (re-)downloaded.
 
-def download_month_netcdf(tabledap_url: str, start_datetime: DatetimeT, destination_dir: Path, verbose: bool = False, force: bool = False):
-    """Download netCDF file for the month starting with the provided datetime."""
-    end_datetime = round_to_next_month(start_datetime)
+    `nc_path_stat` is the stat result of the existing file, or None if there is none.
+    """
+    if force or nc_path_stat is None or not stat.S_ISREG(nc_path_stat.st_mode):
+        return True
+    # an empty file is left over from a failed download
+    if nc_path_stat.st_size == 0:
+        return True
+    # The file was written before the end date time for this monthly chunk's range,
+    # therefore cannot contain the whole month of up to date data - unless somebody predicted the future :)
+    # (compared as POSIX timestamps; naive datetimes are local time, as fromtimestamp would give)
+    return nc_path_stat.st_mtime < end_datetime.timestamp()
 
-    month_nc_url = f"{tabledap_url}.ncCFMA?&time>={format_datetime(start_datetime)}&time<{format_datetime(end_datetime)}"
-    nc_filename = gen_nc_filename(tabledap_url, start_datetime)
-    nc_path = destination_dir / nc_filename
 
-    if nc_path.is_file():
+def skip_current_netcdf(
+    nc_path: Path,
+    nc_path_stat: Optional[os.stat_result],
+    end_datetime: DatetimeT,
+    force: bool = False,
+    verbose: bool = False,
+) -> bool:
+    """Return True, reporting the skip when verbose, if an existing netCDF file needs no (re-)download."""
+    if should_download_netcdf(nc_path_stat, end_datetime, force):
+        return False
+    if verbose:
+        print_line(f"Skipping download. File '{nc_path}' already exists.")
+    return True
+
+
+def download_month_netcdf(
+    tabledap_url: str,
+    start_datetime: DatetimeT,
+    destination_dir: Path,
+    verbose: bool = False,
+    force: bool = False,
+    session: Optional[requests.Session] = None,
+    dataset_name: Optional[str] = None,
+    months_per_file: int = 1,
+    read_timeout: Optional[float] = default_read_timeout,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[Path]:
+    """Download netCDF file for the month starting with the provided datetime, unless an up to date one exists.
+
+    With `months_per_file` greater than one, the file covers that many months instead.
+    `dataset_name` may be passed to avoid re-deriving it from the url for every month.
+    Returns the path of the netCDF file, or None if the month has no data.
+    See fetch_month_netcdf for the remaining arguments.
+    """
+    nc_path = destination_dir / gen_nc_filename(tabledap_url, start_datetime, dataset_name, months_per_file)
+    # a single stat both checks for an existing file and provides its size and mtime
+    try:
+        nc_path_stat = nc_path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        nc_path_stat = None
+
+    if skip_current_netcdf(nc_path, nc_path_stat, add_months(start_datetime, months_per_file), force, verbose):
+        return nc_path
+    return fetch_month_netcdf(
+        tabledap_url, start_datetime, nc_path, nc_path_stat, verbose, force, session, months_per_file, read_timeout, cancel_event,
+    )
+
+
+def fetch_month_netcdf(
+    tabledap_url: str,
+    start_datetime: DatetimeT,
+    nc_path: Path,
+    nc_path_stat: Optional[os.stat_result] = None,
+    verbose: bool = False,
+    force: bool = False,
+    session: Optional[requests.Session] = None,
+    months_per_file: int = 1,
+    read_timeout: Optional[float] = default_read_timeout,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[Path]:
+    """Download the netCDF file for the month starting with the provided datetime to `nc_path`.
+
+    The caller has already decided the file needs downloading; `nc_path_stat` is the stat result
+    of the existing file, or None if there is none.
+    `read_timeout` limits the wait for ERDDAP to send data, in seconds; None waits indefinitely.
+    Once `cancel_event` is set, the download stops at its next chunk and raises DownloadCancelled.
+    Returns `nc_path`, or None if the month has no data.
+    """
+    if session is None:
+        session = _download_session
+
+    end_datetime = add_months(start_datetime, months_per_file)
+    start_str = format_datetime(start_datetime)
+    end_str = format_datetime(end_datetime)
+    month_nc_url = f"{tabledap_url}.ncCFMA?&time>={start_str}&time<{end_str}"
+
+    if nc_path_stat is not None and stat.S_ISREG(nc_path_stat.st_mode):
         if force:
             if verbose:
-                print(f"File '{nc_path}' exists but downloads are forced. Deleting existing file and re-downloading.")
+                print_line(f"File '{nc_path}' exists but downloads are forced. Deleting existing file and re-downloading.")
             nc_path.unlink()
-        else:
-            nc_path_mtime = DatetimeT.fromtimestamp(nc_path.stat().st_mtime)
-            if nc_path_mtime < end_datetime:
-                # The file was written before the end date time for this monthly chunk's range,
-                # therefore cannot contain the whole month of up to date data - unless somebody predicted the future :)
-                if verbose:
-                    print(f"File '{nc_path}' exists but was written before chunk ending {end_datetime}, re-downloading.")
+        elif verbose:
+            if nc_path_stat.st_size == 0:
+                print_line(f"File '{nc_path}' exists but is empty, re-downloading.")
             else:
-                if verbose:
-                    print(f"Skipping download. File '{nc_path}' already exists.")
-                return
+                print_line(f"File '{nc_path}' exists but was written before chunk ending {end_datetime}, re-downloading.")
 
     elif verbose:
-        print(f"Downloading nc for {format_datetime(start_datetime)} - {format_datetime(end_datetime)} to '{nc_path}'.")
-
-    r = requests.get(month_nc_url, allow_redirects=True)
-    # dataset may contain data gaps one month or greater between start and end times
-    if r.status_code == 404 and 'Your query produced no matching results' in str(r.content):
-        print(f'No data found for month {format_datetime(start_datetime)}.')
-        return
-    r.raise_for_status()
-
-    with open(nc_path, "wb") as fp:
-        fp.write(r.content)
-
-
-def get_start_dates_for_date_range(start_datetime: DatetimeT, end_datetime: DatetimeT) -> list[DatetimeT]:
-    month_start_dates = []
-    current_start = round_to_start_of_month(start_datetime)
+        print_line(f"Downloading nc for {start_str} - {end_str} to '{nc_path}'.")
+
+    with session.get(month_nc_url, allow_redirects=True, stream=True, timeout=(connect_timeout, read_timeout)) as r:
+        # dataset may contain data gaps one month or greater between start and end times,
+        # which ERDDAP reports at the start of a 404 error body, so there's no need to read all of it
+        if r.status_code == 404:
+            error_start = next(r.iter_content(chunk_size=4096), b"")
+            if b'Your query produced no matching results' in error_start:
+                if months_per_file == 1:
+                    print_line(f'No data found for month {start_str}.')
+                else:
+                    print_line(f'No data found for {start_str} - {end_str}.')
+                return None
+        r.raise_for_status()
+
+        # stream into a partial file so an interrupted download never looks like a complete month
+        part_path = nc_path.with_name(nc_path.name + ".part")
+        try:
+            with open(part_path, "wb") as fp:
+                for chunk in r.iter_content(chunk_size=download_chunk_size):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise DownloadCancelled(f"Download to '{nc_path}' cancelled.")
+                    fp.write(chunk)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+    part_path.replace(nc_path)
+    return nc_path
+
+
+def get_start_dates_for_date_range(start_datetime: DatetimeT, end_datetime: DatetimeT, months_per_file: int = 1) -> list[DatetimeT]:
+    # count months since year 0 so the range can be enumerated without stepping through datetimes
+    start_month = start_datetime.year * 12 + start_datetime.month - 1
+    end_month = end_datetime.year * 12 + end_datetime.month - 1
     if end_datetime != round_to_start_of_month(end_datetime):
-        end_datetime = round_to_next_month(end_datetime)
-    current_end = round_to_next_month(current_start)
-
-    while current_end <= end_datetime:
-        month_start_dates.append(current_start)
-        current_start = current_end
-        current_end = round_to_next_month(current_end)
-    return month_start_dates
+        # a partial final month is still included
+        end_month += 1
+    # align multi-month windows to a fixed grid (e.g. quarters or calendar years), so file boundaries
+    # don't shift when the requested or available start of the data moves
+    start_month -= start_month % months_per_file
+
+    return [
+        datetime.datetime(year=month // 12, month=month % 12 + 1, day=1)
+        for month in range(start_month, end_month, months_per_file)
+    ]
 
 
 def download_netcdf_range(
@@ -117,15 +282,83 @@ def download_netcdf_range(
     destination_dir: Path,
     verbose: bool = False,
     force: bool = False,
+    max_workers: int = default_max_workers,
+    months_per_file: int = 1,
+    read_timeout: Optional[float] = default_read_timeout,
 ):
-    """Download netCDF files for each month in the provided time range."""
-    for month_start_datetime in get_start_dates_for_date_range(start_datetime, end_datetime):
-        download_month_netcdf(tabledap_url, month_start_datetime, destination_dir, verbose=verbose, force=force)
-
+    """Download netCDF files for each month in the provided time range.
+
+    Months are downloaded concurrently by up to `max_workers` threads sharing one pooled session,
+    so ERDDAP can prepare several monthly responses at once.
+    With `months_per_file` greater than one, each file (and request) covers that many consecutive months.
+    """
+    month_start_datetimes = get_start_dates_for_date_range(start_datetime, end_datetime, months_per_file)
+    # constant for the whole range, so work it out once rather than per month
+    dataset_name = get_dataset_name_from_tabledap_url(tabledap_url)
+    # one directory read tells which months already have a file, rather than probing for each one
+    existing_files = {}
+    with os.scandir(destination_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".nc.part"):
+                # left behind by a run that was killed mid-download; bagging it would add it to the payload
+                os.unlink(entry.path)
+            else:
+                existing_files[entry.name] = entry
+
+    # settle up to date months here, so a fully current bag needs no session or worker threads at all
+    pending_downloads = []
+    for month_start_datetime in month_start_datetimes:
+        nc_filename = gen_nc_filename(tabledap_url, month_start_datetime, dataset_name, months_per_file)
+        existing_entry = existing_files.get(nc_filename)
+        nc_path_stat = existing_entry.stat() if existing_entry is not None else None
+        nc_path = destination_dir / nc_filename
+        if not skip_current_netcdf(nc_path, nc_path_stat, add_months(month_start_datetime, months_per_file), force, verbose):
+            pending_downloads.append((month_start_datetime, nc_path, nc_path_stat))
+
+    if not pending_downloads:
+        return
 
-def gen_nc_filename(tabledap_url: str, start_datetime: DatetimeT) -> str:
-    name_parts = [get_dataset_name_from_tabledap_url(tabledap_url)]
-    name_parts.append(start_datetime.strftime("%Y-%m") + ".nc")
+    session = create_session(pool_size=max_workers, retry_reads=False)
+    cancel_event = threading.Event()
+    # not used as a context manager, whose exit would wait for every download in flight
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    with session:
+        futures = [
+            executor.submit(
+                fetch_month_netcdf, tabledap_url, month_start_datetime, nc_path, nc_path_stat,
+                verbose=verbose, force=force, session=session, months_per_file=months_per_file,
+                read_timeout=read_timeout, cancel_event=cancel_event,
+            )
+            for month_start_datetime, nc_path, nc_path_stat in pending_downloads
+        ]
+        # surface the first failure (or Ctrl-C) as soon as it happens: drop months that haven't started yet
+        # and stop the ones in flight at their next chunk, rather than waiting for them to finish
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except BaseException:
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+
+def gen_nc_filename(
+    tabledap_url: str,
+    start_datetime: DatetimeT,
+    dataset_name: Optional[str] = None,
+    months_per_file: int = 1,
+) -> str:
+    """Name a netCDF file after its dataset and month, or its first and last month if it spans several."""
+    if dataset_name is None:
+        dataset_name = get_dataset_name_from_tabledap_url(tabledap_url)
+    name_parts = [dataset_name]
+    # plain integer formatting gives the same YYYY-MM as strftime("%Y-%m"), without the strftime call
+    if months_per_file > 1:
+        name_parts.append(f"{start_datetime.year:04d}-{start_datetime.month:02d}")
+        start_datetime = add_months(start_datetime, months_per_file - 1)
+    name_parts.append(f"{start_datetime.year:04d}-{start_datetime.month:02d}.nc")
     name = "_".join(name_parts)
     return name
 
@@ -134,51 +367,145 @@ def get_dataset_name_from_tabledap_url(tabledap_url: str) -> str:
     return tabledap_url.split("/")[-1]
 
 
-def get_metadata(tabledap_url: str) -> dict:
-    metadata_url = tabledap_url.replace("/tabledap/", "/info/") + "/index.json"
-    r = requests.get(metadata_url, allow_redirects=True)
-    r.raise_for_status()
-    metadata = json.loads(r.content.decode("utf-8"))
-    return metadata
+def get_cache_dir() -> Path:
+    """Directory for cached HTTP responses, in the user's cache directory ($XDG_CACHE_HOME or ~/.cache).
 
+    Kept away from the bag, since anything inside it would end up in the payload.
+    """
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "bagitify"
 
-def parse_tabledap_metadata(tabledap_metadata: dict) -> dict:
-    rows = tabledap_metadata["table"]["rows"]
-    nested = {}
-    for row in rows:
-        row_type = row[0]
-        var_name = row[1]
-        att_name = row[2]
-        data_type = row[3]
-        data_value = row[4]
 
-        if row_type not in nested:
-            nested[row_type] = {}
+def cached_get(url: str, cache_dir: Optional[Path] = None) -> bytes:
+    """GET a url, revalidating against a copy cached in `cache_dir` when one is available.
 
-        if var_name not in nested[row_type]:
-            nested[row_type][var_name] = {}
+    The cached body is sent back to the server as a conditional request (ETag/Last-Modified),
+    so an unchanged resource costs a 304 response instead of a full transfer.
+    """
+    if cache_dir is None:
+        r = _session.get(url, allow_redirects=True, timeout=request_timeout)
+        r.raise_for_status()
+        return r.content
 
-        nested[row_type][var_name][att_name] = {
-            "data_type": data_type, "data_value": data_value}
-    return nested
+    cache_key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    body_path = cache_dir / cache_key
+    validators_path = cache_dir / f"{cache_key}.json"
 
+    headers = {}
+    cached_body = read_cache_entry(body_path, validators_path)
+    if cached_body is not None:
+        cached_body, validators = cached_body
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
 
-def prep_bagit_metadata(tabledap_url: str, config_metadata: dict) -> dict:
-    tabledap_metadata = parse_tabledap_metadata(get_metadata(tabledap_url))
+    r = _session.get(url, allow_redirects=True, headers=headers, timeout=request_timeout)
+    if r.status_code == 304 and headers:
+        return cached_body
+    r.raise_for_status()
+
+    validators = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+    if any(validators.values()):
+        # the digest ties the validators to this body, in case another run replaces one file but not yet the other
+        validators["sha1"] = hashlib.sha1(r.content).hexdigest()
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            write_file_atomic(body_path, r.content)
+            write_file_atomic(validators_path, json.dumps(validators).encode("utf-8"))
+        except OSError:
+            # the cache only saves transfers on later runs, so a cache directory we can't write to is no reason to fail
+            pass
+    return r.content
+
+
+def read_cache_entry(body_path: Path, validators_path: Path) -> Optional[tuple[bytes, dict]]:
+    """Return the cached body and its validators, or None if the entry is missing, unreadable or inconsistent."""
+    try:
+        body = body_path.read_bytes()
+        validators = json.loads(validators_path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(validators, dict) or validators.get("sha1") != hashlib.sha1(body).hexdigest():
+        return None
+    return body, validators
+
+
+def write_file_atomic(path: Path, content: bytes):
+    """Write `content` to `path` through a partial file, so readers never see a truncated file."""
+    # the pid keeps concurrent runs sharing a cache directory from writing the same partial file
+    part_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+    try:
+        part_path.write_bytes(content)
+        part_path.replace(path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+def get_metadata(tabledap_url: str, cache_dir: Optional[Path] = None) -> dict:
+    metadata_url = tabledap_url.replace("/tabledap/", "/info/") + "/index.json"
+    # json.loads detects the UTF encoding of bytes itself, so skip building an intermediate str
+    metadata = json.loads(cached_get(metadata_url, cache_dir))
+    return metadata
+
+
+def get_global_attribute(tabledap_metadata: dict, att_name: str) -> str:
+    """Return the value of a NC_GLOBAL attribute, scanning only as far as its row."""
+    for row_type, var_name, row_att_name, _, data_value in tabledap_metadata["table"]["rows"]:
+        if row_type == "attribute" and var_name == "NC_GLOBAL" and row_att_name == att_name:
+            return data_value
+    raise KeyError(f"Global attribute '{att_name}' not found in dataset metadata")
+
+
+def prep_bagit_metadata(
+    tabledap_url: str,
+    config_metadata: dict,
+    cache_dir: Optional[Path] = None,
+    tabledap_metadata: Optional[dict] = None,
+) -> dict:
+    """Build bag-info metadata, fetching the dataset metadata unless it was already retrieved."""
+    if tabledap_metadata is None:
+        tabledap_metadata = get_metadata(tabledap_url, cache_dir)
     bagit_metadata = config_metadata
     bagit_metadata["External-Description"] = (
       f'Sensor data from station {"".join(tabledap_url.split("/")[-1].split(".")[0:-1])}'
     )
-    title = tabledap_metadata["attribute"]["NC_GLOBAL"]["title"]["data_value"]
+    title = get_global_attribute(tabledap_metadata, "title")
     bagit_metadata["External-Identifier"] = title
 
     return bagit_metadata
 
 
-def bag_it_up(bag_directory: Path, bagit_metadata: dict, create: bool = True):
-    """Create or update a BagIt archive."""
+def default_checksum_processes(payload_directory: Path) -> int:
+    """One hashing process per CPU this process may run on, but no more than there are payload files."""
+    # sched_getaffinity honours CPU pinning (e.g. docker --cpuset-cpus), unlike os.cpu_count
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    payload_files = sum(len(file_names) for _, _, file_names in os.walk(payload_directory))
+    return max(1, min(cpus, payload_files))
+
+
+def bag_it_up(
+    bag_directory: Path,
+    bagit_metadata: dict,
+    create: bool = True,
+    checksums: Optional[list[str]] = None,
+    processes: Optional[int] = None,
+):
+    """Create or update a BagIt archive.
+
+    `checksums` selects the manifest algorithms for a new bag (sha256 by default);
+    an existing bag keeps the algorithms of its current manifests.
+    Payload files are hashed by `processes` worker processes, see default_checksum_processes for the default.
+    """
+    # imported here so that --help and failed url probes don't pay for bagit's import
+    import bagit
+
+    if processes is None:
+        # a new bag's payload is still at the top level, make_bag moves it into data/
+        processes = default_checksum_processes(bag_directory if create else bag_directory / "data")
+
     if create:
-        bagit.make_bag(bag_directory, bag_info=bagit_metadata, checksums=["sha256"])
+        bagit.make_bag(bag_directory, bag_info=bagit_metadata, checksums=checksums or default_checksums, processes=processes)
         return  # new bag created, done
 
     # Open the existing bag
@@ -187,29 +514,50 @@ def bag_it_up(bag_directory: Path, bagit_metadata: dict, create: bool = True):
     bag.info.update(bagit_metadata)
     # Any potentially new files have already been written to the `data` payload directory,
     # so just persist any metadata changes made and update manifests with checksums
-    bag.save(manifests=True)
+    bag.save(processes=processes, manifests=True)
+
+
+def release_page_cache(directory: Path):
+    """Hint the kernel to drop cached pages of the files in `directory`, where supported (Linux).
+
+    Once a bag has been hashed its payload isn't read again, so there's no point keeping
+    possibly gigabytes of netCDF data in the page cache at the expense of other processes.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in directory.iterdir():
+        if not path.is_file():
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
 
 
 def config_metadata_from_env() -> dict:
     config_items = ["Bag-Group-Identifier", "Contact-Email", "Contact-Name",
                     "Contact-Phone", "Organization-address", "Source-Organization"]
+    prefixes = {item: "BAGIT_" + item.upper().replace("-", "_") for item in config_items}
 
-    config_metadata = {}
-    env_keys = list(dict(os.environ).keys())
+    # bucket environment values by config item in a single pass over the environment
+    values_from_env = {item: [] for item in config_items}
+    for key, value in os.environ.items():
+        for item, prefix in prefixes.items():
+            if key.startswith(prefix):
+                values_from_env[item].append(value)
 
+    config_metadata = {}
     for item in config_items:
-        var_name = "BAGIT_" + item.upper().replace("-", "_")
-        r = re.compile(f'^{var_name}')
-
-        vars_from_env = list(filter(r.match, env_keys))
+        vars_from_env = values_from_env[item]
         if len(vars_from_env) < 1:
-            print(f'Warning: {var_name} not set! Defaulting to empty string.')
+            print(f'Warning: {prefixes[item]} not set! Defaulting to empty string.')
             from_env = ""
             # If we want to exit instead, or perform more validation, change this.
         elif len(vars_from_env) == 1:
-            from_env = os.environ.get(vars_from_env[0])
+            from_env = vars_from_env[0]
         else:
-            from_env = [os.environ.get(v) for v in vars_from_env]
+            from_env = vars_from_env
 
         config_metadata[item] = from_env
 
@@ -223,6 +571,11 @@ def run(
     requested_end_datetime: Optional[DatetimeT] = None,
     verbose: bool = False,
     force: bool = False,
+    max_workers: int = default_max_workers,
+    checksums: Optional[list[str]] = None,
+    months_per_file: int = 1,
+    processes: Optional[int] = None,
+    read_timeout: Optional[float] = default_read_timeout,
 ):
     # clean up tabledap url
     tabledap_url = tabledap_url.lower()
@@ -230,40 +583,62 @@ def run(
     if tabledap_url.endswith(".html"):
         tabledap_url = tabledap_url.removesuffix(".html")
 
-    # determine actual range of data available in the target tabledap dataset
-    data_start_datetime, data_end_datetime = get_start_end(tabledap_url)
-    print(f'Dataset has time range {format_datetime(data_start_datetime)} - {format_datetime(data_end_datetime)}')
-
-    # adjust start and end time if sane arguments were provided
-    bag_start_datetime = max((d for d in [requested_start_datetime, data_start_datetime] if d))
-    bag_end_datetime = min((d for d in [requested_end_datetime, data_end_datetime] if d))
-
     # use default bag directory based on dataset name if not provided
     if not bag_directory:
         bag_directory = Path.cwd() / "bagit_archives" / get_dataset_name_from_tabledap_url(tabledap_url)
 
-    # make sure the bag directory exists
-    bag_directory.mkdir(parents=True, exist_ok=True)
-    # check if bag already exists
-    bag_exists = bag_directory.joinpath("bagit.txt").is_file()
-    # set destination for netCDF file downloads
-    data_destination = bag_directory.joinpath("data") if bag_exists else bag_directory
+    cache_dir = get_cache_dir()
+
+    # nothing else depends on the dataset metadata until the bag is written, so fetch it in the background
+    with ThreadPoolExecutor(max_workers=1) as metadata_executor:
+        metadata_future = metadata_executor.submit(get_metadata, tabledap_url, cache_dir)
 
-    download_netcdf_range(tabledap_url, bag_start_datetime, bag_end_datetime, data_destination, verbose, force)
+        # determine actual range of data available in the target tabledap dataset
+        data_start_datetime, data_end_datetime = get_start_end(tabledap_url, cache_dir)
+        print(f'Dataset has time range {format_datetime(data_start_datetime)} - {format_datetime(data_end_datetime)}')
+
+        # adjust start and end time if sane arguments were provided
+        bag_start_datetime = max((d for d in [requested_start_datetime, data_start_datetime] if d))
+        bag_end_datetime = min((d for d in [requested_end_datetime, data_end_datetime] if d))
+
+        # only create the bag directory once the dataset is known to exist
+        bag_directory.mkdir(parents=True, exist_ok=True)
+        # check if bag already exists
+        bag_exists = bag_directory.joinpath("bagit.txt").is_file()
+        # set destination for netCDF file downloads
+        data_destination = bag_directory.joinpath("data") if bag_exists else bag_directory
+
+        download_netcdf_range(
+            tabledap_url, bag_start_datetime, bag_end_datetime, data_destination, verbose, force, max_workers, months_per_file,
+            read_timeout,
+        )
+
+        tabledap_metadata = metadata_future.result()
 
     config_metadata = config_metadata_from_env()
-    bagit_metadata = prep_bagit_metadata(tabledap_url, config_metadata)
+    bagit_metadata = prep_bagit_metadata(tabledap_url, config_metadata, cache_dir, tabledap_metadata)
 
     # update or create the bagit archive
-    bag_it_up(bag_directory, bagit_metadata, create=not bag_exists)
+    bag_it_up(bag_directory, bagit_metadata, create=not bag_exists, checksums=checksums, processes=processes)
+    release_page_cache(bag_directory.joinpath("data"))
 
 
 @click.command()
 @click.option('-d', '--bag-directory', type=click.Path(writable=True, file_okay=False, path_type=Path))
-@click.option('-s', '--start-date', type=click.DateTime(click_datetime_formats), default=None)
-@click.option('-e', '--end-date', type=click.DateTime(click_datetime_formats), default=None)
+@click.option('-s', '--start-date', type=IsoDateTime(), default=None)
+@click.option('-e', '--end-date', type=IsoDateTime(), default=None)
 @click.option('-v', '--verbose/--no-verbose', default=False)
 @click.option('-f', '--force/--no-force', default=False)
+@click.option('-w', '--workers', type=click.IntRange(min=1), default=default_max_workers, show_default=True,
+              help='Number of monthly netCDF files to download concurrently.')
+@click.option('-c', '--checksum', 'checksums', type=click.Choice(checksum_algorithms), multiple=True,
+              help='Manifest checksum algorithm for a new bag; may be repeated.  [default: sha256]')
+@click.option('-m', '--months-per-file', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of consecutive months to request from ERDDAP and store in each netCDF file.')
+@click.option('-p', '--processes', type=click.IntRange(min=1), default=None,
+              help='Number of processes used to checksum the bag payload.  [default: number of usable CPUs, at most one per file]')
+@click.option('-t', '--read-timeout', type=click.IntRange(min=0), default=default_read_timeout, show_default=True,
+              help='Seconds to wait for ERDDAP to send netCDF data before giving up; 0 waits indefinitely.')
 @click.argument('tabledap_url')
 def cli(
   bag_directory: Path,
@@ -271,10 +646,18 @@ def cli(
   end_date: DatetimeT,
   verbose: bool,
   force: bool,
+  workers: int,
+  checksums: tuple[str, ...],
+  months_per_file: int,
+  processes: Optional[int],
+  read_timeout: int,
   tabledap_url: str,
 ):
     """Generate NCEI bagit archives from an ERDDAP tabledap dataset at TABLEDAP_URL."""
-    run(tabledap_url, bag_directory, start_date, end_date, verbose, force)
+    run(
+        tabledap_url, bag_directory, start_date, end_date, verbose, force, workers, list(checksums), months_per_file, processes,
+        read_timeout or None,
+    )
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
 from datetime import datetime
 from pathlib import Path
+import hashlib
 import json
 import os
 import shutil
+import threading
+
+import click
+import pytest
+import requests
 
 from bagitify import bagitify
 
@@ -11,6 +17,14 @@ testing_netcdf = os.path.join(test_data_dir, "netcdf")
 testing_metadata = os.path.join(test_data_dir, "metadata.json")
 
 
+def test_add_months():
+    assert bagitify.add_months(datetime(2023, 3, 22, 15, 30), 1) == datetime(2023, 4, 1)
+    assert bagitify.add_months(datetime(2023, 11, 1), 1) == datetime(2023, 12, 1)
+    assert bagitify.add_months(datetime(2023, 12, 31, 23, 59, 59), 1) == datetime(2024, 1, 1)
+    assert bagitify.add_months(datetime(2023, 11, 1), 14) == datetime(2025, 1, 1)
+    assert bagitify.add_months(datetime(2023, 2, 1), -3) == datetime(2022, 11, 1)
+
+
 def test_get_start_dates_for_date_range():
     assert bagitify.get_start_dates_for_date_range(
         start_datetime=datetime(2023, 3, 22),
@@ -46,6 +60,202 @@ def test_get_start_dates_for_date_range():
     ]
 
 
+def test_get_start_dates_for_date_range_months_per_file():
+    # windows start on the same grid whichever month the range starts in, so file names stay stable
+    for start_datetime in [datetime(2022, 1, 1), datetime(2022, 2, 1), datetime(2022, 3, 15)]:
+        month_start_datetimes = bagitify.get_start_dates_for_date_range(start_datetime, datetime(2022, 8, 20), months_per_file=3)
+        assert month_start_datetimes == [datetime(2022, 1, 1), datetime(2022, 4, 1), datetime(2022, 7, 1)]
+        assert [bagitify.gen_nc_filename("https://erddap/tabledap/ds", d, months_per_file=3) for d in month_start_datetimes] == [
+            "ds_2022-01_2022-03.nc", "ds_2022-04_2022-06.nc", "ds_2022-07_2022-09.nc",
+        ]
+
+    assert bagitify.get_start_dates_for_date_range(datetime(2021, 6, 1), datetime(2023, 1, 1), months_per_file=12) == [
+        datetime(2021, 1, 1),
+        datetime(2022, 1, 1),
+    ]
+
+
+def test_iso_datetime_param():
+    param_type = bagitify.IsoDateTime()
+
+    assert param_type.convert("2022-05-01", None, None) == datetime(2022, 5, 1)
+    assert param_type.convert("2022-05-01T12:30:00Z", None, None) == datetime(2022, 5, 1, 12, 30)
+    assert param_type.convert("2022-05-01T02:00:00+02:00", None, None) == datetime(2022, 5, 1)
+    with pytest.raises(click.BadParameter):
+        param_type.convert("05/01/2022", None, None)
+
+
+def test_should_download_netcdf(tmp_path):
+    end_datetime = datetime(2022, 6, 1)
+    nc_path = tmp_path / "edu_usf_marine_comps_2022-05.nc"
+
+    assert bagitify.should_download_netcdf(None, end_datetime)
+
+    nc_path.write_bytes(b"")
+    os.utime(nc_path, (0, datetime(2022, 6, 2).timestamp()))
+    assert bagitify.should_download_netcdf(nc_path.stat(), end_datetime)
+
+    nc_path.write_bytes(b"CDF")
+    os.utime(nc_path, (0, datetime(2022, 6, 2).timestamp()))
+    assert not bagitify.should_download_netcdf(nc_path.stat(), end_datetime)
+    assert bagitify.should_download_netcdf(nc_path.stat(), end_datetime, force=True)
+
+    os.utime(nc_path, (0, datetime(2022, 5, 31).timestamp()))
+    assert bagitify.should_download_netcdf(nc_path.stat(), end_datetime)
+
+
+def test_download_month_netcdf_cancelled(tmp_path):
+    session = requests.Session()
+    session.get = lambda url, **kwargs: make_response(200, b"CDF" * 10)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(bagitify.DownloadCancelled):
+        bagitify.download_month_netcdf(
+            "https://erddap/tabledap/ds", datetime(2022, 5, 1), tmp_path, session=session, cancel_event=cancel_event,
+        )
+    # neither a complete looking file nor a partial one is left behind
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_netcdf_range_removes_partial_files(tmp_path):
+    nc_path = tmp_path / "ds_2022-05.nc"
+    nc_path.write_bytes(b"CDF")
+    (tmp_path / "ds_2022-06.nc.part").write_bytes(b"CD")
+
+    # every month is already current, so this only scans the directory
+    bagitify.download_netcdf_range("https://erddap/tabledap/ds", datetime(2022, 5, 1), datetime(2022, 5, 20), tmp_path)
+
+    assert list(tmp_path.iterdir()) == [nc_path]
+
+
+def test_gen_nc_filename():
+    tabledap_url = "https://erddap.secoora.org/erddap/tabledap/edu_usf_marine_comps_1407d550"
+
+    assert bagitify.gen_nc_filename(tabledap_url, datetime(2022, 5, 1)) == "edu_usf_marine_comps_1407d550_2022-05.nc"
+    assert bagitify.gen_nc_filename(
+        tabledap_url, datetime(2022, 11, 1), months_per_file=3,
+    ) == "edu_usf_marine_comps_1407d550_2022-11_2023-01.nc"
+
+
+def make_response(status_code: int, content: bytes = b"", headers: dict = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+
+def test_get_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert bagitify.get_cache_dir() == tmp_path / "xdg" / "bagitify"
+
+    monkeypatch.delenv("XDG_CACHE_HOME")
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    assert bagitify.get_cache_dir() == tmp_path / "home" / ".cache" / "bagitify"
+
+
+def test_cached_get_revalidates(tmp_path, monkeypatch):
+    url = "https://erddap/info/ds/index.json"
+    requests_sent = []
+
+    def get(url, headers=None, **kwargs):
+        requests_sent.append(headers or {})
+        return responses.pop(0)
+
+    monkeypatch.setattr(bagitify._session, "get", get)
+
+    responses = [make_response(200, b"body", {"ETag": '"abc"'}), make_response(304)]
+    assert bagitify.cached_get(url, tmp_path) == b"body"
+    assert requests_sent[0] == {}
+    # the second request is conditional, and the 304 is answered from the cache
+    assert bagitify.cached_get(url, tmp_path) == b"body"
+    assert requests_sent[1] == {"If-None-Match": '"abc"'}
+
+    # a response without validators can't be revalidated, so nothing is cached for it
+    responses = [make_response(200, b"other body")]
+    assert bagitify.cached_get("https://erddap/tabledap/ds.csv0", tmp_path) == b"other body"
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_cached_get_unwritable_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(bagitify._session, "get", lambda url, **kwargs: make_response(200, b"body", {"ETag": '"abc"'}))
+    # a regular file in the way of the cache directory makes every cache write fail
+    (tmp_path / "not_a_dir").write_bytes(b"")
+
+    assert bagitify.cached_get("https://erddap/info/ds/index.json", tmp_path / "not_a_dir" / "cache") == b"body"
+
+
+def test_read_cache_entry(tmp_path):
+    body_path = tmp_path / "entry"
+    validators_path = tmp_path / "entry.json"
+    assert bagitify.read_cache_entry(body_path, validators_path) is None
+
+    body = b'{"table": {}}'
+    validators = {"etag": '"abc"', "last_modified": None, "sha1": hashlib.sha1(body).hexdigest()}
+    bagitify.write_file_atomic(body_path, body)
+    bagitify.write_file_atomic(validators_path, json.dumps(validators).encode("utf-8"))
+    assert bagitify.read_cache_entry(body_path, validators_path) == (body, validators)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["entry", "entry.json"]
+
+    # a truncated body no longer matches its validators
+    body_path.write_bytes(body[:5])
+    assert bagitify.read_cache_entry(body_path, validators_path) is None
+
+    body_path.write_bytes(body)
+    validators_path.write_text('{"etag": ')
+    assert bagitify.read_cache_entry(body_path, validators_path) is None
+
+
+def test_parse_and_format_datetime():
+    assert bagitify.parse_datetime("2022-05-01T00:00:00Z") == datetime(2022, 5, 1)
+    assert bagitify.parse_datetime("2023-11-30T23:59:59Z") == datetime(2023, 11, 30, 23, 59, 59)
+
+    assert bagitify.format_datetime(datetime(2022, 5, 1)) == "2022-05-01T00:00:00Z"
+    assert bagitify.format_datetime(datetime(2023, 11, 30, 23, 59, 59, 500)) == "2023-11-30T23:59:59Z"
+
+    dt_str = "2024-02-29T12:34:56Z"
+    assert bagitify.format_datetime(bagitify.parse_datetime(dt_str)) == dt_str
+    assert bagitify.format_datetime(bagitify.parse_datetime(dt_str)) == bagitify.parse_datetime(dt_str).strftime(bagitify.dt_format)
+
+
+def test_get_global_attribute():
+    tabledap_metadata = {"table": {"rows": [
+        ["attribute", "NC_GLOBAL", "institution", "String", "USF"],
+        ["attribute", "NC_GLOBAL", "title", "String", "Marine COMPS station"],
+        ["variable", "time", "", "double", ""],
+        ["attribute", "time", "title", "String", "Not the global title"],
+    ]}}
+
+    assert bagitify.get_global_attribute(tabledap_metadata, "title") == "Marine COMPS station"
+    with pytest.raises(KeyError):
+        bagitify.get_global_attribute(tabledap_metadata, "summary")
+
+
+def test_config_metadata_from_env(monkeypatch):
+    for key in list(os.environ):
+        if key.startswith("BAGIT_"):
+            monkeypatch.delenv(key)
+    monkeypatch.setenv("BAGIT_BAG_GROUP_IDENTIFIER", "bgi")
+    monkeypatch.setenv("BAGIT_CONTACT_PHONE", "cp")
+    monkeypatch.setenv("BAGIT_CONTACT_PHONE_2", "cp2")
+
+    config_metadata = bagitify.config_metadata_from_env()
+
+    assert config_metadata["Bag-Group-Identifier"] == "bgi"
+    assert set(config_metadata["Contact-Phone"]) == {"cp", "cp2"}
+    assert config_metadata["Contact-Email"] == ""
+
+
+def test_default_checksum_processes(tmp_path):
+    assert bagitify.default_checksum_processes(tmp_path) == 1
+
+    for month in range(1, 3):
+        (tmp_path / f"ds_2022-{month:02d}.nc").write_bytes(b"CDF")
+    assert 1 <= bagitify.default_checksum_processes(tmp_path) <= 2
+
+
 def test_archive_creation(tmp_path):
     tmp_bag_dir = os.path.join(tmp_path, "bagdir")
     shutil.copytree(testing_netcdf, tmp_bag_dir, symlinks=False, ignore=None, copy_function=shutil.copy2,